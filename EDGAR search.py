@@ -1,8 +1,15 @@
 #!/usr/bin/env python3
 # Import necessary libraries
-import time, re, csv, requests, datetime  # Standard libraries for time, regex, CSV handling, HTTP requests, and date manipulation
+import re, datetime  # Standard libraries for regex and date manipulation
+import httpx  # Used for HTTP/2 requests to SEC (install with "httpx[http2]")
+import gzip, json, pathlib  # Used for the compressed on-disk cache of the ticker map
+from concurrent.futures import ThreadPoolExecutor, as_completed  # Used to fetch submissions and documents in parallel
+import numpy as np  # Used to compute the risk state of every row at once
+import pandas as pd  # Used to write the results to CSV
+from rate_limiter import RateLimiter  # Shared with the cefdata scripts
 
-# Define user-agent header for SEC requests
+# Define user-agent header for SEC requests. Accept-Encoding is left to httpx, which asks for gzip/deflate
+# and adds br / zstd only when it can decode them (pip install brotli for br)
 UA = {"User-Agent": "YourName your.email@example.com"}  # REQUIRED by SEC to access their data
 
 # List of tickers to scan (edit as needed)
@@ -13,6 +20,9 @@ FORMS = {"8-K","25","25-NSE","15-12B","15-12G","15-15D","S-4","F-4",
          "DEFM14A","PREM14A","SC 13E3","SC 13E-3","TO-T","TO-I","14D-9",
          "6-K","N-8F","497"}
 
+# Forms whose classification depends only on the form type (deregistration / delisting), so the document is never fetched
+FORM_ONLY_FORMS = {"15-12B","15-12G","15-15D","25","25-NSE"}
+
 # Regular expression to search for relevant keywords in filings (e.g., merger, acquisition, bankruptcy)
 KW = re.compile(r"(merger|agreement and plan of merger|plan of merger|going ?private|"
                 r"acquisition|tender offer|cash merger|take-?private|"
@@ -22,96 +32,180 @@ KW = re.compile(r"(merger|agreement and plan of merger|plan of merger|going ?pri
 # Date cutoff for the filings (files from the last 90 days)
 CUTOFF = datetime.date.today() - datetime.timedelta(days=90)
 
+# Number of requests to SEC allowed in flight at once
+MAX_WORKERS = 8
+
+# One HTTP/2 client shared by every worker thread: concurrent requests to www.sec.gov / data.sec.gov
+# are multiplexed over a few kept-alive connections
+CLIENT = httpx.Client(http2=True, headers=UA, timeout=30, follow_redirects=True,
+                      limits=httpx.Limits(max_connections=10, max_keepalive_connections=10))
+
+LIMITER = RateLimiter(rate=10, per=1.0)  # SEC asks for no more than 10 requests per second
+
+# Compressed on-disk copy of the ticker map, stored with the ETag it was downloaded under
+TICKER_CACHE = pathlib.Path.home() / ".cache" / "edgar_tickers.json.gz"
+
 # Map tickers to their corresponding CIK (Central Index Key) using SEC's public JSON data
 def map_ticker_to_cik():
-    m = requests.get("https://www.sec.gov/files/company_tickers.json", headers=UA, timeout=30).json()
-    return {v["ticker"].upper(): str(v["cik_str"]).zfill(10) for v in m.values()}
+    try:
+        cached = json.loads(gzip.decompress(TICKER_CACHE.read_bytes()))  # {"etag": ..., "map": {...}}
+    except (OSError, EOFError, ValueError):
+        cached = None  # No usable cache yet
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]  # Ask SEC to answer 304 if the file hasn't changed
+    with LIMITER:
+        r = CLIENT.get("https://www.sec.gov/files/company_tickers.json", headers=headers)
+    if r.status_code == 304 and cached:
+        return cached["map"]  # Unchanged: reuse the cached map without downloading it again
+    m = r.json()
+    mapping = {v["ticker"].upper(): str(v["cik_str"]).zfill(10) for v in m.values()}
+    if r.headers.get("ETag"):
+        TICKER_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        TICKER_CACHE.write_bytes(gzip.compress(json.dumps({"etag": r.headers["ETag"], "map": mapping}).encode("utf-8")))
+    return mapping
 
 # Get the recent filings for a given CIK
 def submissions(cik):
-    return requests.get(f"https://data.sec.gov/submissions/CIK{cik}.json", headers=UA, timeout=30).json()
+    with LIMITER:
+        return CLIENT.get(f"https://data.sec.gov/submissions/CIK{cik}.json").json()
 
-# Fetch the specific document using the CIK, accession number, and document name
-def fetch_doc(cik, acc_no, primary_doc):
-    url = f"https://www.sec.gov/Archives/edgar/data/{int(cik)}/{acc_no.replace('-','')}/{primary_doc}"
-    r = requests.get(url, headers=UA, timeout=30)
-    r.raise_for_status()  # Raise an exception if the request fails
-    return r.text  # Return the document content as a string
+# One combined pattern for every content-based flag in classify(); the group name says which flag fired.
+# Each group sits in a zero-width lookahead so a match consumes no text: a deal_closed hit like
+# "closing of the merger agreement" still lets deal_announced match the "merger agreement" inside it
+CLASSIFY_RE = re.compile(r"(?=(?P<deal_announced>agreement and plan of merger|plan of merger|merger agreement))|"
+                         r"(?=(?P<tender_offer>tender offer|14D-9))|"
+                         r"(?=(?P<going_private>going ?private|13E-3))|"
+                         r"(?=(?P<liquidation>plan of liquidation|plan of dissolution|liquidat))|"
+                         r"(?=(?P<bankruptcy>item\s*1\.03|chapter\s*11|bankruptcy|receivership))|"
+                         r"(?=(?P<delist_notice>item\s*3\.01|delist))|"
+                         r"(?=(?P<deal_closed>item\s*2\.01|completion of (?:the )?merger|closing of the merger))", re.I)
 
-# Classify the document into categories based on its content (e.g., merger, tender offer, liquidation)
-def classify(form, html):
+# Limits for streaming a document: read at most MAX_DOC_CHARS, carrying WINDOW_OVERLAP characters between
+# chunks so a match split across a chunk boundary is still found
+MAX_DOC_CHARS = 2_000_000
+WINDOW_OVERLAP = 256
+
+# Build the flags dict from the set of CLASSIFY_RE groups that matched
+def build_flags(form, seen):
     flags = {
-        "deal_announced": bool(re.search(r"(agreement and plan of merger|plan of merger|merger agreement)", html, re.I)),
-        "tender_offer": bool(re.search(r"tender offer|14D-9", html, re.I)),
-        "going_private": bool(re.search(r"going ?private|13E-3", html, re.I)),
-        "liquidation": bool(re.search(r"plan of liquidation|plan of dissolution|liquidat", html, re.I)),
-        "bankruptcy": bool(re.search(r"item\s*1\.03|chapter\s*11|bankruptcy|receivership", html, re.I)),
-        "delist_notice": bool(re.search(r"item\s*3\.01|delist", html, re.I)),
+        "deal_announced": "deal_announced" in seen,
+        "tender_offer": "tender_offer" in seen,
+        "going_private": "going_private" in seen,
+        "liquidation": "liquidation" in seen,
+        "bankruptcy": "bankruptcy" in seen,
+        "delist_notice": "delist_notice" in seen,
         "deregistration": form in {"15-12B","15-12G","15-15D"},
         "delisted": form in {"25","25-NSE"}
     }
     # If the merger or transaction has closed
-    flags["deal_closed"] = bool(re.search(r"item\s*2\.01|completion of (the )?merger|closing of the merger", html, re.I))
+    flags["deal_closed"] = "deal_closed" in seen
     return flags
 
+# Classify the document into categories based on its content (e.g., merger, tender offer, liquidation)
+def classify(form, html):
+    # Single pass over the document, stopping early once every flag has been seen
+    seen = set()
+    for m in CLASSIFY_RE.finditer(html):
+        seen.add(m.lastgroup)
+        if len(seen) == len(CLASSIFY_RE.groupindex):
+            break
+    return build_flags(form, seen)
+
+# Classify a document that arrives in chunks; returns (keyword_hit, flags)
+def classify_stream(form, chunks):
+    seen = set()
+    kw_hit = form == "8-K"  # 8-Ks are classified without needing a keyword hit
+    tail, total = "", 0
+    for chunk in chunks:
+        window = tail + chunk
+        kw_hit = kw_hit or bool(KW.search(window))  # Check if the filing matches our keywords
+        seen.update(m.lastgroup for m in CLASSIFY_RE.finditer(window))
+        total += len(chunk)
+        # Stop reading once nothing more can change, or the document is too large to be worth finishing
+        if (kw_hit and len(seen) == len(CLASSIFY_RE.groupindex)) or total >= MAX_DOC_CHARS:
+            break
+        tail = window[-WINDOW_OVERLAP:]
+    return kw_hit, build_flags(form, seen)
+
+# Stream the specific document using the CIK, accession number, and document name, classifying it as it downloads
+def fetch_doc(cik, acc_no, primary_doc, form):
+    url = f"https://www.sec.gov/Archives/edgar/data/{int(cik)}/{acc_no.replace('-','')}/{primary_doc}"
+    with LIMITER:
+        r = CLIENT.send(CLIENT.build_request("GET", url), stream=True)
+    try:
+        r.raise_for_status()  # Raise an exception if the request fails
+        return classify_stream(form, r.iter_text(chunk_size=65536))
+    finally:
+        r.close()  # Closing the response drops the rest of the body if we stopped early
+
 # Main scanning function for all tickers
 def scan(tickers):
     tic2cik = map_ticker_to_cik()  # Map tickers to CIKs
     out = []
-    for t in tickers:
-        cik = tic2cik.get(t.upper())  # Get CIK for each ticker
-        if not cik:
-            out.append({"ticker": t, "note": "CIK not found"}); continue  # Skip tickers without a CIK
-        j = submissions(cik)  # Get the recent submissions for the CIK
-        r = j.get("filings", {}).get("recent", {})  # Get the recent filings data
-        forms = r.get("form", [])
-        dates = r.get("filingDate", [])
-        accs  = r.get("accessionNumber", [])
-        docs = r.get("primaryDocument", [])
-        for i, f in enumerate(forms):
-            # Date cutoff to limit the range of filings
-            try:
-                fdate = datetime.date.fromisoformat(dates[i])
-            except Exception:
-                continue
-            if fdate < CUTOFF:  # Skip filings older than the cutoff
-                continue
-            if f not in FORMS:  # Only process the relevant forms
-                continue
-            rec = {"ticker": t.upper(), "cik": cik, "form": f, "date": dates[i],
-                   "accession": accs[i], "primary_document": docs[i]}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        # First pass: request the recent submissions of every known ticker in parallel
+        found = [(t, tic2cik.get(t.upper())) for t in tickers]  # Get CIK for each ticker
+        subs = ex.map(submissions, [cik for _, cik in found if cik])  # Results come back in ticker order
+        pending = {}  # Document fetch future -> the record it belongs to
+        for t, cik in found:
+            if not cik:
+                out.append({"ticker": t, "note": "CIK not found"}); continue  # Skip tickers without a CIK
+            j = next(subs)  # Get the recent submissions for the CIK
+            r = j.get("filings", {}).get("recent", {})  # Get the recent filings data
+            forms = r.get("form", [])
+            dates = r.get("filingDate", [])
+            accs  = r.get("accessionNumber", [])
+            docs = r.get("primaryDocument", [])
+            for i, f in enumerate(forms):
+                # Date cutoff to limit the range of filings
+                try:
+                    fdate = datetime.date.fromisoformat(dates[i])
+                except Exception:
+                    continue
+                if fdate < CUTOFF:  # Skip filings older than the cutoff
+                    continue
+                if f not in FORMS:  # Only process the relevant forms
+                    continue
+                rec = {"ticker": t.upper(), "cik": cik, "form": f, "date": dates[i],
+                       "accession": accs[i], "primary_document": docs[i]}
+                out.append(rec)  # Appended now so the output keeps filing order
+                if f in FORM_ONLY_FORMS:  # The form alone decides the flags: skip the download and regex work
+                    rec.update(classify(f, ""))
+                    continue
+                pending[ex.submit(fetch_doc, cik, accs[i], docs[i], f)] = rec  # Fetch and scan the filing document
+
+        # Second pass: record each document's classification as soon as its fetch completes
+        for fut in as_completed(pending):
+            rec = pending[fut]
             try:
-                html = fetch_doc(cik, accs[i], docs[i])  # Fetch the filing document
-                if f == "8-K" or KW.search(html):  # Check if the filing matches our keywords
-                    rec.update(classify(f, html))  # Classify the document based on its content
+                kw_hit, flags = fut.result()
+                if kw_hit:  # 8-K, or the filing matches our keywords
+                    rec.update(flags)  # Classify the document based on its content
             except Exception as e:
                 rec["error"] = str(e)[:120]  # Capture any errors and store them
-            out.append(rec)
-            time.sleep(0.25)  # Sleep to avoid overloading the SEC server
-        time.sleep(0.25)  # Sleep to avoid overloading the SEC server
     return out
 
-# Function to determine the "risk state" based on the flags set in classify()
-def risk_state(row):
-    if row.get("delisted"): return "DELISTED"
-    if row.get("deregistration"): return "DEREGISTERING"
-    if row.get("bankruptcy"): return "BANKRUPTCY"
-    if row.get("deal_closed"): return "MERGER CLOSED"
-    if row.get("deal_announced") or row.get("tender_offer") or row.get("going_private"): return "TRANSACTION ANNOUNCED"
-    if row.get("liquidation"): return "LIQUIDATION PLAN"
-    if row.get("delist_notice"): return "DELIST NOTICE"
-    return ""  # If none of the above, return an empty string
+# Function to determine the "risk state" of every row based on the flags set in classify()
+def risk_states(df):
+    # Treat a missing flag column or an unclassified row as False
+    def flag(name):
+        return df[name].eq(True) if name in df.columns else pd.Series(False, index=df.index)
+    # Conditions are checked in priority order; the first one that holds wins
+    return np.select(
+        [flag("delisted"), flag("deregistration"), flag("bankruptcy"), flag("deal_closed"),
+         flag("deal_announced") | flag("tender_offer") | flag("going_private"),
+         flag("liquidation"), flag("delist_notice")],
+        ["DELISTED", "DEREGISTERING", "BANKRUPTCY", "MERGER CLOSED",
+         "TRANSACTION ANNOUNCED", "LIQUIDATION PLAN", "DELIST NOTICE"],
+        default="")  # If none of the above, use an empty string
 
 # Function to write the results to a CSV file
 def write_csv(rows, path="tradeability_risk_events.csv"):
     if not rows: return  # If no data, don't write anything
-    fields = sorted({k for r in rows for k in r.keys()}.union({"state"}))  # Get all the keys (fields) in the data and add 'state'
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fields)  # Create a CSV writer
-        w.writeheader()  # Write the header row
-        for r in rows:
-            r["state"] = risk_state(r)  # Add the "state" field based on risk_state
-            w.writerow(r)  # Write each row of data
+    df = pd.DataFrame(rows)  # One column per key found in any row
+    df["state"] = risk_states(df)  # Add the "state" column based on the flags
+    df[sorted(df.columns)].to_csv(path, index=False)  # Write all rows with the columns in sorted order
 
 # Main execution block
 if __name__ == "__main__":
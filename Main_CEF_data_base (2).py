@@ -1,114 +1,117 @@
 # Import necessary libraries
-import re  # Used for regular expression operations to search for specific patterns (like dates)
-import time  # Used for adding delays (e.g., when retrying failed requests)
-import random  # Used to generate random numbers for varying sleep intervals between retries
-import requests  # Used for making HTTP requests to fetch webpage content
-from bs4 import BeautifulSoup  # Used for parsing and extracting data from HTML content
-import pandas as pd  # Used for data manipulation and saving data to Excel
-from requests.adapters import HTTPAdapter  # Used to configure HTTP request retries
-from urllib3.util.retry import Retry  # Used for setting retry behavior for HTTP requests
-from datetime import datetime  # Used to work with dates and times
-
-# Function to parse a date from a given key text
-def parse_date_from_key(key_text):
+import asyncio  # Used to run the ticker fetches concurrently
+import json  # Used to store the page cache on disk
+import aiohttp  # Used for making asynchronous HTTP requests to fetch webpage content
+from aiolimiter import AsyncLimiter  # Used to cap the request rate across all concurrent fetches
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential, RetryError  # Used to retry transient failures
+import pandas as pd  # Used for the optional Excel export
+import pyarrow as pa  # Used to build the rows written to Parquet
+import pyarrow.parquet as pq  # Used to write the results to Parquet files
+from pathlib import Path  # Used for the location of the page cache
+from cef_fetch import HEADERS, TARGET_KEYS, parse_html_memo  # Shared request headers, field names and memoized page parser
+
+# Concurrency and retry settings for the fetches
+MAX_CONCURRENCY = 4  # Maximum number of tickers fetched at the same time
+LIMITER = AsyncLimiter(max_rate=4, time_period=1.0)  # At most 4 requests per second, shared by every fetch
+MAX_ATTEMPTS = 4  # Attempts per ticker before giving up on a transient failure
+BACKOFF_FACTOR = 1  # Factor by which the delay increases after each failure (1s, 2s, 4s, ...)
+MAX_BACKOFF = 30  # Longest wait between two attempts, in seconds
+TIMEOUT = aiohttp.ClientTimeout(total=15)  # Total time allowed for one request
+
+# Output files: successes are appended to PARQUET_PATH as they arrive, failed tickers go to FAILED_PATH
+PARQUET_PATH = "Cef_Data_Base.parquet"
+FAILED_PATH = "Cef_Data_Base_failed.parquet"
+EXPORT_EXCEL = False  # Set True to also export both files to Cef_Data_Base.xlsx at the end
+
+# Every field parse_html can return plus the ticker, all stored as strings
+SCHEMA = pa.schema([(name, pa.string()) for name in ["Ticker", "Earnings / Share", "UNII / Share", *sorted(TARGET_KEYS)]])
+
+# On-disk cache of each page's validators (ETag / Last-Modified) and the fields parsed from it,
+# so an unchanged page costs one 304 round-trip and no parse on the next run
+CACHE_PATH = Path(".web_cache.json")
+
+# Load the page cache written by the previous run (empty if there is none)
+def load_cache():
+    try:
+        return json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+# Save the page cache for the next run
+def save_cache(cache):
+    CACHE_PATH.write_text(json.dumps(cache), encoding="utf-8")
+
+# Raised for a failure worth retrying: a bad status, a connection error or timeout, or a page with no data
+class TransientError(Exception):
+    pass
+
+# Function to fetch data from a URL; transient failures are retried with capped exponential backoff
+@retry(wait=wait_exponential(multiplier=BACKOFF_FACTOR, max=MAX_BACKOFF),
+       stop=stop_after_attempt(MAX_ATTEMPTS),
+       retry=retry_if_exception_type(TransientError))
+async def fetch_data_from_url(session, sem, cache, url):
     """
-    Attempts to parse a date in the form (mm/dd/yy) from the key text.
-    If no date is found, return a 'very old' date so that if there's another
-    dated entry, that will supersede this one.
+    Returns: (fund_data, permanent_failure)
+      - fund_data is a dict of extracted fields, or None with permanent_failure True on a 404
+      - raises RetryError once MAX_ATTEMPTS attempts have all failed with a TransientError
+    A cached page is revalidated with a conditional GET; on 304 its cached fields are returned.
     """
-    # Regular expression to search for date in (mm/dd/yy) format
-    match = re.search(r'\((\d{1,2}/\d{1,2}/\d{2})\)', key_text)
-    if match:
-        date_str = match.group(1)  # Extract the matched date string
-        # Parse the date string into a datetime object
-        return datetime.strptime(date_str, '%m/%d/%y')
+    entry = cache.get(url)
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        # Only MAX_CONCURRENCY requests are in flight at once (the slot is not held while backing off),
+        # and each waits for the rate limiter
+        async with sem, LIMITER:
+            async with session.get(url, headers=headers, timeout=TIMEOUT) as response:
+                status = response.status
+                text = await response.text() if status == 200 else None
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Exception while fetching {url}: {e!r}")
+        raise TransientError(f"{url}: {e!r}") from e
+
+    if status == 304 and entry:
+        # Page unchanged since the last run: skip the body and the parse
+        return dict(entry["data"]), False
+    elif status == 200:
+        # Parse on a worker thread so other responses keep arriving meanwhile
+        final_data = await asyncio.to_thread(parse_html_memo, text)
+        if not final_data:
+            print(f"No data found on {url}.")
+            raise TransientError(f"{url}: no data")
+        if etag or last_modified:
+            cache[url] = {"etag": etag, "last_modified": last_modified, "data": dict(final_data)}
+        return final_data, False
+    elif status == 404:
+        print(f"404 error for {url}. Permanent failure.")
+        return None, True  # Return True for permanent failure in case of 404 error
     else:
-        # Return a very old date if no date is found
-        return datetime(1900, 1, 1)
+        print(f"Failed to fetch data from {url}. Status code: {status}")
+        raise TransientError(f"{url}: status code {status}")  # Retryable failure for other status codes
 
-# Function to fetch data from a URL with retry mechanism
-def fetch_data_from_url(url, max_retries=5, backoff_factor=1):
+# Function to fetch data for one ticker
+async def fetch(session, sem, cache, ticker):
     """
-    Returns: (fund_data, permanent_failure)
+    Returns: (ticker, fund_data, permanent_failure)
       - fund_data is either a dict of extracted fields or None
       - permanent_failure is True if a 404 error was encountered (no point retrying)
     """
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/91.0.4472.124 Safari/537.36"
-        )
-    }
-
-    # Setting up the session with retry configuration
-    session = requests.Session()
-    retries = Retry(
-        total=max_retries,  # Maximum number of retries
-        backoff_factor=backoff_factor,  # Factor by which the delay increases after each failure
-        status_forcelist=[500, 502, 503, 504],  # Retry for these status codes
-        raise_on_status=False  # Don't raise an exception on error status codes
-    )
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-
+    url = f"https://cefdata.com/funds/{ticker}"  # Construct the URL for the ticker
     try:
-        # Send the GET request to fetch content from the URL
-        response = session.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            # Parse the HTML content of the response
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Temporary storage for dated fields
-            earnings_dict = {}
-            unii_dict = {}
-
-            # Other direct fields for final data
-            final_data = {}
-
-            # Loop through all <td> elements in the HTML (table data)
-            elements = soup.find_all('td')
-            for i in range(len(elements) - 1):
-                key = elements[i].text.strip()  # Extract the text from the current <td>
-                val = elements[i+1].text.strip()  # Extract the text from the next <td>
-
-                # Check for specific keys and extract data accordingly
-                if "UNII / Share" in key:
-                    date_obj = parse_date_from_key(key)  # Parse the date if found
-                    unii_dict[date_obj] = val  # Store value in unii_dict with the date as key
-                elif "Earnings / Share" in key:
-                    date_obj = parse_date_from_key(key)
-                    earnings_dict[date_obj] = val  # Store value in earnings_dict
-                elif key in [
-                    "Current Distribution", "Earn Coverage", "Duration", "Maturity",
-                    "Rel Lev Cost", "Outstanding Shares", "Estimated Total Assets",
-                    "Total Leverage", "Average Discount (3 Yr)", "Market Yield",
-                    "Div Growth (3yr)", "Credit Rating (rbo)", "AMT", "Expense Ratio"
-                ]:
-                    final_data[key] = val  # Directly store relevant fields in final_data
-
-            # Pick the most recent dated values
-            if earnings_dict:
-                latest = max(earnings_dict)  # Get the most recent date from earnings_dict
-                final_data["Earnings / Share"] = earnings_dict[latest]  # Store the most recent value
-            if unii_dict:
-                latest = max(unii_dict)
-                final_data["UNII / Share"] = unii_dict[latest]  # Store the most recent UNII value
-
-            # Return the final data if available, and False for permanent failure
-            return (final_data if final_data else None), False
-
-        elif response.status_code == 404:
-            print(f"404 error for {url}. Permanent failure.")
-            return None, True  # Return True for permanent failure in case of 404 error
-        else:
-            print(f"Failed to fetch data from {url}. Status code: {response.status_code}")
-            return None, False  # Retryable failure for other status codes
-
+        data, permanent = await fetch_data_from_url(session, sem, cache, url)
+    except RetryError:
+        print(f"Giving up on {ticker} after {MAX_ATTEMPTS} attempts.")
+        data, permanent = None, False  # Still failing after every retry
     except Exception as e:
         print(f"Exception while fetching {url}: {e}")
-        return None, False  # Retryable failure for any other exception
+        data, permanent = None, False  # Unexpected error (e.g. while parsing): not retried
+    return ticker, data, permanent
 
 # ------------------- MAIN SCRIPT STARTS HERE -------------------
 
@@ -117,64 +120,53 @@ tickers = [
     "BNY", "ENX", "MHN", "MYN", "NAN", "NNY", "NRK", "NXN", "PNI", "VTN"
 ]
 
-# Initialize lists to store data and failed tickers
-all_data = []  # Successful data
-permanent_failed = []  # Tickers that permanently failed (e.g., 404 error)
-temp_failed = []  # Tickers that failed temporarily and will be retried
-
-# First pass: Fetch data for each ticker
-for ticker in tickers:
-    url = f"https://cefdata.com/funds/{ticker}"  # Construct the URL for each ticker
-    data, permanent = fetch_data_from_url(url)  # Fetch the data using the function
-    if data:
-        data["Ticker"] = ticker  # Add ticker to the data
-        all_data.append(data)  # Add the data to the success list
-        print(f"Data for {ticker}: {data}")
-    else:
-        if permanent:
-            print(f"Permanent failure for {ticker}.")
-            permanent_failed.append(ticker)  # Add to permanent failures if it was a 404
-        else:
-            print(f"No data returned for {ticker}.")
-            temp_failed.append(ticker)  # Add to temporary failures
-    time.sleep(random.uniform(5, 15))  # Random sleep time between requests to avoid throttling
-
-# Retry logic: Retry fetching data for failed tickers up to 3 times
-max_rounds = 3
-round_number = 1
-failed_tickers = temp_failed  # Start with the temporary failures
-
-while failed_tickers and round_number <= max_rounds:
-    print(f"\n--- Retry Round {round_number} for tickers: {failed_tickers} ---")
-    current_failures = []  # List of tickers that failed in this round
-    for ticker in failed_tickers:
-        url = f"https://cefdata.com/funds/{ticker}"
-        data, permanent = fetch_data_from_url(url)  # Retry fetching the data
-        if data:
-            data["Ticker"] = ticker
-            all_data.append(data)  # Add successful data
-            print(f"Data for {ticker} fetched on retry {round_number}: {data}")
-        else:
-            if permanent:
-                print(f"Permanent failure detected for {ticker} on retry {round_number}.")
-                permanent_failed.append(ticker)  # Add to permanent failures if it was a 404
-            else:
-                current_failures.append(ticker)  # Add to temporary failures for further retrying
-        time.sleep(random.uniform(5, 15))  # Random sleep between retries
-    failed_tickers = current_failures  # Update list of failed tickers
-    round_number += 1  # Move to the next round
-
-# Combine all final failed tickers (permanent + those that still failed after retries)
-final_failed = permanent_failed + failed_tickers
-
-# Convert the successful data and failed tickers into Pandas DataFrames
-df_success = pd.DataFrame(all_data)
-df_failed = pd.DataFrame(final_failed, columns=["Ticker"])
-
-# Write both success and failed data to an Excel file
-excel_path = "Cef_Data_Base.xlsx"
-with pd.ExcelWriter(excel_path) as writer:
-    df_success.to_excel(writer, sheet_name="Success", index=False)  # Save successful data
-    df_failed.to_excel(writer, sheet_name="Failed", index=False)  # Save failed tickers
-
-print(f"\nData saved to {excel_path}")
+# Fetch every ticker concurrently (each fetch retries its own transient failures);
+# each success is appended to the Parquet file as soon as its fetch completes
+async def main():
+    permanent_failed = set()  # Tickers that permanently failed (e.g., 404 error)
+    failed = set()  # Tickers that still failed after every retry
+    cache = load_cache()  # Validators and parsed fields from the previous run
+
+    # One connection pool shared by every fetch, keeping connections alive between requests
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY, limit_per_host=MAX_CONCURRENCY, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
+        # ParquetWriter is a plain (sync) context manager, so it gets its own with statement
+        with pq.ParquetWriter(PARQUET_PATH, SCHEMA, compression="zstd") as writer:
+            sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+            # Fetch every ticker at once (a set, so a ticker listed twice is fetched once),
+            # handling each as soon as it finishes
+            for next_result in asyncio.as_completed([fetch(session, sem, cache, ticker) for ticker in set(tickers)]):
+                ticker, data, permanent = await next_result
+                if data:
+                    data["Ticker"] = ticker  # Add ticker to the data
+                    writer.write_table(pa.Table.from_pylist([data], schema=SCHEMA))  # Persist the success right away
+                    print(f"Data for {ticker}: {data}")
+                elif permanent:
+                    print(f"Permanent failure for {ticker}.")
+                    permanent_failed.add(ticker)  # Add to permanent failures if it was a 404
+                else:
+                    failed.add(ticker)
+
+    save_cache(cache)
+
+    # Combine all final failed tickers (permanent + those that still failed after retries)
+    final_failed = sorted(permanent_failed | failed)
+    pq.write_table(pa.table({"Ticker": pa.array(final_failed, pa.string())}), FAILED_PATH, compression="zstd")
+    print(f"\nData saved to {PARQUET_PATH} (failed tickers in {FAILED_PATH})")
+
+# Optional export: copy both Parquet files into the Success / Failed sheets of an Excel file
+def export_excel(excel_path="Cef_Data_Base.xlsx"):
+    df_success = pd.read_parquet(PARQUET_PATH)
+    df_failed = pd.read_parquet(FAILED_PATH)
+
+    with pd.ExcelWriter(excel_path) as writer:
+        df_success.to_excel(writer, sheet_name="Success", index=False)  # Save successful data
+        df_failed.to_excel(writer, sheet_name="Failed", index=False)  # Save failed tickers
+
+    print(f"Data exported to {excel_path}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    if EXPORT_EXCEL:
+        export_excel()
@@ -1,23 +1,93 @@
 # Import necessary libraries
-import re, time, unicodedata  # Used for regular expression, time delays, and Unicode normalization
+import re, sys, unicodedata  # Used for regular expression, string interning, and Unicode normalization
+import asyncio  # Used to render several tickers at the same time
+import time  # Used by the rate limiter's clock
+from urllib.parse import urlsplit  # Used to find the host a request goes to
+from concurrent.futures import ThreadPoolExecutor  # Used to run the blocking static fetches and parses in parallel
+import gzip  # Used to compress the cached HTML
+import queue, threading, atexit, os  # Used to write the HTML cache on a background thread
+from datetime import date  # Used to key the HTML cache by day
+from pathlib import Path  # Used for the location of the HTML cache
 from typing import Dict, List  # Used for type hinting (specifying dictionary and list types)
-import pandas as pd  # Used for data manipulation and saving to Excel
-from bs4 import BeautifulSoup  # Used for parsing HTML content
-from playwright.sync_api import sync_playwright  # Used for automating web scraping via Playwright
+from functools import lru_cache  # Used to memoize label canonicalization
+import requests  # Used to fetch the static HTML when httpx is not installed
+from requests.adapters import HTTPAdapter  # Used to size the session's connection pool
+import pyarrow as pa  # Used to build the rows written to Parquet
+import pyarrow.parquet as pq  # Used to write the rows to Parquet as they are scraped
+from openpyxl import Workbook  # Used for the optional Excel export
+from html_doc import parse_document  # Used for parsing HTML content, tolerating empty or odd pages
+from html import unescape  # Used to decode entities in values sliced out of the raw HTML
+try:
+    import ahocorasick  # Optional (pip install pyahocorasick): finds every label in one pass over the raw HTML
+except ImportError:
+    ahocorasick = None
+from lxml import etree  # Used to precompile the XPath queries
+from playwright.async_api import async_playwright  # Used for automating web scraping via Playwright
 
 # Base URL and tickers to scrape
 BASE = "https://cefdata.com"
 TICKERS = ['BFZ', 'CEV', 'EVM', 'MUC', 'NAC', 'NCA', 'NKX', 'NXC', 'PCK', 'PCQ', 'PZC', 'VCV']
-OUT_XLSX = "Cef_Data_Base.xlsx"  # Output Excel file name
-DEBUG_SAVE_HTML = True  # Whether to save the HTML for debugging purposes (set False after it works)
+OUT_PARQUET = "Cef_Data_Base.parquet"  # Output file, one row appended per ticker as soon as it is scraped
+OUT_XLSX = "Cef_Data_Base.xlsx"  # Excel copy of OUT_PARQUET, written at the end when EXPORT_EXCEL is set
+EXPORT_EXCEL = False  # Set True if an Excel file is needed as well
+CACHE_DIR = Path(".cache")  # Raw HTML of each ticker, one gzip file per ticker per day
+FORCE_RESCRAPE = False  # Set True to ignore today's cached HTML and fetch every ticker again
+MAX_PAGES = 6  # Number of browser pages (and so tickers) rendering at the same time
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+)
+MIN_STATIC_LABELS = 8  # Fall back to Playwright when the static HTML yields fewer labels than this
+MAX_WORKERS = 8  # Threads for the static fast path (socket reads and parsing); the browser is bounded by MAX_PAGES
 
-# Canonical labels we want to extract from the page
-TARGET_LABELS = {
+# Shared client for the static fast path, keeping connections to cefdata.com alive between tickers:
+# HTTP/2 through httpx when it is installed with its http2 extra ("httpx[http2]"), so concurrent
+# requests share one TLS connection; otherwise a pooled requests.Session
+try:
+    import httpx
+    CLIENT = httpx.Client(http2=True, headers={"User-Agent": USER_AGENT}, timeout=15.0, follow_redirects=True,
+                          limits=httpx.Limits(max_keepalive_connections=16, max_connections=32))
+    FETCH_ERRORS = (httpx.HTTPError,)
+except ImportError:  # httpx itself, or the h2 package http2=True needs, is missing
+    CLIENT = requests.Session()
+    CLIENT.headers.update({"User-Agent": USER_AGENT})
+    CLIENT.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+    FETCH_ERRORS = (requests.RequestException,)
+
+# Token bucket on the monotonic clock: allows `burst` requests at once, then `rate` per second.
+# A request only sleeps when it would actually go over that rate.
+class TokenBucket:
+    def __init__(self, rate=2.0, burst=4):
+        self.interval = 1.0 / rate  # Seconds it takes to refill one token
+        self.burst_window = (burst - 1) * self.interval  # How far ahead of the clock requests may book
+        self.next_time = time.monotonic()  # When the bucket will next be full again
+
+    # Wait for a token. The slot is reserved before sleeping, so concurrent tasks never get the same one
+    async def acquire(self):
+        now = time.monotonic()
+        wait = max(0.0, self.next_time - self.burst_window - now)
+        self.next_time = max(now, self.next_time) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+# One bucket per host, so each site is throttled on its own
+LIMITERS: Dict[str, TokenBucket] = {}
+
+# Wait until a request to this URL's host is allowed
+async def rate_limit(url: str):
+    host = urlsplit(url).hostname or ""
+    if host not in LIMITERS:
+        LIMITERS[host] = TokenBucket(rate=2.0, burst=4)
+    await LIMITERS[host].acquire()
+
+# Canonical labels we want to extract from the page (interned, as is every label to_canonical returns,
+# so membership checks in the parse loop compare pointers)
+TARGET_LABELS = frozenset(sys.intern(label) for label in {
     "UNII / Share", "Earnings / Share", "Current Distribution", "Earn Coverage", "Duration", "Maturity",
     "Relative Leverage Cost", "Number of Shares Outstanding", "Estimated Total Assets", "Total Leverage Ratio",
     "Average Discount (1 Yr)", "Distribution Rate based on Market Price", "Dividend Growth (3 Yr)", 
     "Credit Rating (Rated Bonds Only)", "AMT", "Expense Ratio",
-}
+})
 
 # Alias labels to standardize variations in text
 ALIASES = {
@@ -41,161 +111,390 @@ PATTERNS = {
     "AMT": r"\bAMT\b", "Expense Ratio": r"\bExpense\s+Ratio\b",
 }
 
-# Normalize and standardize the text
+# PATTERNS compiled once at import, plus one alternation of all of them with a named group per label
+# (L0, L1, ...) so a single walk over the page finds every label
+COMPILED = {k: re.compile(v, re.I) for k, v in PATTERNS.items()}
+MASTER = re.compile("|".join(f"(?P<L{i}>{v})" for i, v in enumerate(PATTERNS.values())), re.I)
+MASTER_LABELS = {f"L{i}": k for i, k in enumerate(PATTERNS)}  # Group name -> canonical label
+
+# Literal spellings of each label (lowercase) for the Aho-Corasick scan -> canonical label: the canonical
+# label itself, its aliases, and the other spellings PATTERNS accepts. The automaton maps each literal
+# to (canonical label, length of the literal).
+LABEL_LITERALS = {label.lower(): label for label in TARGET_LABELS}
+LABEL_LITERALS.update({alias.lower(): label for alias, label in ALIASES.items()})
+LABEL_LITERALS.update({"rel lev. cost": "Relative Leverage Cost", "average discount (3 yr)": "Average Discount (1 Yr)",
+                       "distribution rate based on market price": "Distribution Rate based on Market Price"})
+if ahocorasick is not None:
+    AUTOMATON = ahocorasick.Automaton()
+    for literal, label in LABEL_LITERALS.items():
+        AUTOMATON.add_word(literal, (label, len(literal)))
+    AUTOMATON.make_automaton()
+else:
+    AUTOMATON = None
+
+# Right after a label: the rest of its text (e.g. a date), the tags closing its cell, then the next cell's content
+NEXT_CELL_RE = re.compile(r"[^<]{0,40}(?:</[a-z][^>]*>\s*){1,3}<(td|th|dd)\b[^>]*>(.*?)</\1\s*>", re.I | re.S)
+TAG_RE = re.compile(r"<[^>]+>")
+NEXT_CELL_WINDOW = 2000  # Characters after a label that the next-cell regex looks at
+
+# Compiled once: label/value rows, definition lists, and the cells / terms inside them
+TR2 = etree.XPath("//tr[count(td)=2]")  # Rows with exactly two <td> cells: label, value
+TDS = etree.XPath("td")
+DLS = etree.XPath("//dl")
+DTS = etree.XPath(".//dt")
+DDS = etree.XPath(".//dd")
+
+# Compiled once for the fuzzy label search: the text nodes to search (tables and definition lists first,
+# then the whole page minus scripts and styles), and the places a label's value can sit
+TABLE_TEXTS = etree.XPath("//table//text() | //dl//text()")
+PAGE_TEXTS = etree.XPath("//text()[not(parent::script or parent::style)]")
+NEXT_CELL = etree.XPath("following-sibling::*[self::td or self::th][1]")
+ROW = etree.XPath("ancestor::tr[1]")
+ROW_CELLS = etree.XPath(".//td | .//th")
+NEXT_DD = etree.XPath("following-sibling::dd[1]")
+NEXT_TEXTS = etree.XPath("(descendant::text() | following::text())[normalize-space()][position() <= 8]")
+
+# Regular expressions used on every label, compiled once
+_WS_RE = re.compile(r"\s+")
+_DATE_RE = re.compile(r"\s*\(\d{2}/\d{2}/\d{4}\)\s*$")
+
+# Normalize and standardize the text (memoized: the same labels and values repeat across tickers)
+@lru_cache(maxsize=4096)
 def canon_text(s: str) -> str:
     s = unicodedata.normalize("NFKC", s or "").strip()  # Normalize Unicode characters
-    s = re.sub(r"\s+", " ", s)  # Replace consecutive spaces with a single space
+    s = _WS_RE.sub(" ", s)  # Replace consecutive spaces with a single space
     return s
 
 # Strip the date from labels like "UNII / Share (07/31/2025)" -> "UNII / Share"
 def strip_label_dates(label: str) -> str:
-    return re.sub(r"\s*\(\d{2}/\d{2}/\d{4}\)\s*$", "", label)
+    return _DATE_RE.sub("", label)
 
-# Convert labels to canonical form using the defined aliases
+# Convert labels to canonical form using the defined aliases (memoized, so a repeated label is a dict lookup)
+@lru_cache(maxsize=4096)
 def to_canonical(label: str) -> str:
     label = canon_text(strip_label_dates(label))
     if label in TARGET_LABELS:
-        return label
-    return ALIASES.get(label, label)
-
-# Use Playwright to render the page and get the HTML content
-def render_with_playwright(url: str) -> str:
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True, args=["--disable-blink-features=AutomationControlled"])
-        context = browser.new_context(user_agent=(
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-            "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
-        ))
-        page = context.new_page()
-        page.set_default_timeout(30000)
-        
+        return sys.intern(label)
+    return sys.intern(ALIASES.get(label, label))
+
+# Playwright, the browser, its one context and the pool of pages open in it:
+# started on first use, shared by every ticker after that
+_PW = None
+_BROWSER = None
+_CONTEXT = None
+_POOL = None
+_PW_LOCK = asyncio.Lock()  # Makes sure concurrent first renders start only one browser
+
+# Resource types the scraper never needs: only the HTML (and the scripts that build it) are loaded
+BLOCKED_RESOURCES = {"image", "font", "media", "stylesheet", "other"}
+
+# Abort requests for blocked resource types, let everything else through
+async def _block_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+# Open one pooled page in the shared context
+async def _new_page():
+    page = await _CONTEXT.new_page()
+    page.set_default_timeout(30000)
+    return page
+
+# Return the page pool, launching Playwright and the browser the first time a page needs rendering
+async def _get_pool() -> asyncio.Queue:
+    global _PW, _BROWSER, _CONTEXT, _POOL
+    async with _PW_LOCK:
+        if _POOL is None:
+            _PW = await async_playwright().start()
+            _BROWSER = await _PW.chromium.launch(headless=True, args=["--disable-blink-features=AutomationControlled"])
+            _CONTEXT = await _BROWSER.new_context(user_agent=USER_AGENT)
+            await _CONTEXT.route("**/*", _block_resources)  # Applies to every page opened in this context
+            pool = asyncio.Queue()
+            for _ in range(MAX_PAGES):
+                pool.put_nowait(await _new_page())
+            _POOL = pool
+    return _POOL
+
+# Close the browser (and the context and pages in it) and stop Playwright, if they were ever started
+async def _shutdown():
+    global _PW, _BROWSER, _CONTEXT, _POOL
+    if _BROWSER is not None:
+        await _BROWSER.close()
+    if _PW is not None:
+        await _PW.stop()
+    _PW = _BROWSER = _CONTEXT = _POOL = None
+
+# Use Playwright to render the page and get the HTML content, borrowing a page from the pool
+async def render_with_playwright(url: str) -> str:
+    pool = await _get_pool()
+    page = await pool.get()  # Waits here while all MAX_PAGES pages are busy
+    try:
         # Try warming the page first
         gate = f"{BASE}/ch/{url.rsplit('/',2)[-2]}/"
         try:
-            page.goto(gate)
+            await rate_limit(gate)
+            await page.goto(gate)
         except Exception:
             pass
-        time.sleep(0.5)  # Small wait to make sure the page loads
-        page.goto(url)  # Navigate to the final page URL
-        # Wait for key texts to appear on the page
+        await asyncio.sleep(0.5)  # Small wait to make sure the page loads (other tickers keep running)
+        await rate_limit(url)
+        await page.goto(url, wait_until="domcontentloaded")  # Navigate to the final page URL
+        # Wait for any one of the key texts to appear on the page (a single combined wait, best effort)
         wait_texts = [
             "Number of Shares Outstanding", "Expense Ratio", "Current Distribution", 
             "Distribution Rate based on Market Price",
         ]
-        for t in wait_texts:
-            try:
-                page.get_by_text(t, exact=False).first.wait_for(timeout=5000)
-                break
-            except Exception:
-                continue
-        html = page.content()  # Get the HTML content after rendering
-        context.close()
-        browser.close()
-        return html
-
-# Find the value near a given label (uses regex patterns)
-def find_value_near_label(soup: BeautifulSoup, pattern: str) -> str | None:
-    node = soup.find(string=re.compile(pattern, re.I))  # Find a node that matches the pattern
-    if not node:
-        return None
-    el = node.parent if hasattr(node, "parent") else None
-    if not el:
+        combined = page.get_by_text(wait_texts[0], exact=False)
+        for t in wait_texts[1:]:
+            combined = combined.or_(page.get_by_text(t, exact=False))
+        try:
+            await combined.first.wait_for(timeout=5000)
+        except Exception:
+            pass
+        return await page.content()  # Get the HTML content after rendering
+    finally:
+        # Navigate away so the page drops this ticker's DOM before its next use; replace it if it died
+        try:
+            await page.goto("about:blank")
+        except Exception:
+            if page.is_closed():
+                page = await _new_page()
+        pool.put_nowait(page)  # Hand the page back for the next ticker
+
+# Text of an element with each piece stripped and joined by single spaces
+def element_text(el) -> str:
+    return " ".join(t.strip() for t in el.itertext() if t.strip())
+
+# Find the value near a text node that matched a label's pattern
+def find_value_near_label(node, pattern: re.Pattern) -> str | None:
+    # The element the text sits in: its parent, or for tail text (after a child's closing tag) the child's parent
+    el = node.getparent()
+    if el is not None and node.is_tail:
+        el = el.getparent()
+    if el is None:
         return None
     
     # Check common structures for matching: <tr><td>Label</td><td>Value</td>
-    if el.name in ("td", "th"):
-        sib = el.find_next_sibling(["td", "th"])
+    if el.tag in ("td", "th"):
+        sib = NEXT_CELL(el)
         if sib:
-            v = canon_text(sib.get_text(" ", strip=True))
+            v = canon_text(element_text(sib[0]))
             if v:
                 return v
         # Or try to get the next sibling in the row
-        row = el.find_parent("tr")
+        row = ROW(el)
         if row:
-            cells = row.find_all(["td", "th"])
+            cells = ROW_CELLS(row[0])
             if len(cells) >= 2:
-                v = canon_text(cells[1].get_text(" ", strip=True))
+                v = canon_text(element_text(cells[1]))
                 if v:
                     return v
 
     # Definition list structure: <dt>Label</dt><dd>Value</dd>
-    if el.name == "dt":
-        dd = el.find_next_sibling("dd")
+    if el.tag == "dt":
+        dd = NEXT_DD(el)
         if dd:
-            v = canon_text(dd.get_text(" ", strip=True))
+            v = canon_text(element_text(dd[0]))
             if v:
                 return v
 
-    # Generic fallback: Next visible text block
-    nxt = el.find_next(string=True)
-    tries = 0
-    while nxt and tries < 8:
+    # Generic fallback: the next few non-blank text nodes, found by libxml2 in one query
+    for nxt in NEXT_TEXTS(el):
         v = canon_text(str(nxt))
-        if v and not re.search(pattern, v, re.I):
+        if v and not pattern.search(v):
             return v
-        nxt = nxt.next_element
-        tries += 1
     return None
 
+# Look for the missing labels in one pass over the given text nodes, adding what is found to out;
+# returns the labels still missing. Only the first matching node of each label is tried.
+def search_labels(texts, missing: set, out: Dict[str, str]) -> set:
+    missing = set(missing)
+    untried = set(missing)
+    for node in texts:
+        if not MASTER.search(node):
+            continue
+        for label in {MASTER_LABELS[m.lastgroup] for m in MASTER.finditer(node)} & untried:
+            untried.discard(label)
+            v = find_value_near_label(node, COMPILED[label])
+            if v:
+                out[label] = v
+                missing.discard(label)
+                if not missing:
+                    return missing  # Every label found: no need to look at the rest of the nodes
+        if not untried:
+            break
+    return missing
+
+# Find the missing labels with the Aho-Corasick automaton in one linear pass over the raw HTML, reading
+# each value from the cell that follows the label; adds what is found to out and returns the labels still missing
+def scan_labels(html: str, missing: set, out: Dict[str, str]) -> set:
+    missing = set(missing)
+    lowered = html.lower()
+    if AUTOMATON is None or len(lowered) != len(html):
+        return missing  # No automaton, or lowercasing moved characters so indexes would not line up
+    for end, (label, length) in AUTOMATON.iter(lowered):
+        if label not in missing:
+            continue
+        start = end - length + 1
+        # Whole words only, as the \b in PATTERNS requires
+        if (start > 0 and lowered[start - 1].isalnum()) or (end + 1 < len(lowered) and lowered[end + 1].isalnum()):
+            continue
+        m = NEXT_CELL_RE.match(html, end + 1, end + 1 + NEXT_CELL_WINDOW)
+        if not m:
+            continue
+        v = canon_text(unescape(TAG_RE.sub(" ", m.group(2))))
+        if v:
+            out[label] = v
+            missing.discard(label)
+            if not missing:
+                break
+    return missing
+
 # Parse the HTML content and extract key data
 def parse_html(html: str) -> Dict[str, str]:
-    soup = BeautifulSoup(html, "lxml")  # Parse the HTML using BeautifulSoup and lxml parser
     out: Dict[str, str] = {}
+    tree = parse_document(html)  # Parse the HTML with lxml
+    if tree is None:
+        return out  # Empty or unparseable page (the caller falls back to Playwright)
     # Fast path for extracting data from <tr><td> and <dl><dt> elements
-    for tr in soup.select("tr"):
-        tds = tr.find_all("td")
-        if len(tds) == 2:
-            k = to_canonical(tds[0].get_text(strip=True))  # Standardize label
-            v = canon_text(tds[1].get_text(" ", strip=True))  # Get value and normalize
-            if k in TARGET_LABELS and v:
-                out[k] = v
-    for dl in soup.select("dl"):
-        for dt, dd in zip(dl.find_all("dt"), dl.find_all("dd")):
-            k = to_canonical(dt.get_text(strip=True))
-            v = canon_text(dd.get_text(" ", strip=True))
+    for tr in TR2(tree):
+        label_td, value_td = TDS(tr)
+        k = to_canonical(label_td.text_content().strip())  # Standardize label
+        v = canon_text(element_text(value_td))  # Get value (text pieces joined by spaces) and normalize
+        if k in TARGET_LABELS and v:
+            out[k] = v
+    for dl in DLS(tree):
+        for dt, dd in zip(DTS(dl), DDS(dl)):
+            k = to_canonical(dt.text_content().strip())
+            v = canon_text(element_text(dd))
             if k in TARGET_LABELS and v:
                 out[k] = v
-    # Fallback: Use regex patterns to extract data for missing labels
-    for canon_label, pat in PATTERNS.items():
-        if canon_label in out:
-            continue
-        v = find_value_near_label(soup, pat)
-        if v:
-            out[canon_label] = v
+    if len(out) == len(TARGET_LABELS):
+        return out  # The fast path found every label: skip the fuzzy search
+    # Fallback for missing labels: a literal scan of the raw HTML first (when pyahocorasick is installed),
+    # then the regex patterns in one pass over the text nodes of just the tables and definition lists;
+    # the rest of the page is searched only if labels are still missing after that
+    missing = scan_labels(html, set(PATTERNS) - set(out), out)
+    if missing:
+        missing = search_labels(TABLE_TEXTS(tree), missing, out)
+    if missing:
+        search_labels(PAGE_TEXTS(tree), missing, out)
     return out
 
+# Thread pool for the blocking fast-path work, sized on its own rather than by the default executor
+EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
+# Run a blocking call on EXECUTOR without holding up the event loop
+async def run_blocking(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(EXECUTOR, fn, *args)
+
+# Fetch the page without a browser; returns "" if the request fails
+def fetch_static(url: str) -> str:
+    try:
+        r = CLIENT.get(url, timeout=10)
+        return r.text if r.status_code == 200 else ""
+    except FETCH_ERRORS:
+        return ""
+
+# Cache writes are queued and done by one background thread, so no scrape waits on compression or disk I/O
+_WRITE_Q = queue.Queue()  # (path, html) pairs, then None to stop the writer
+
+# Compress and write queued (path, html) pairs until the None sentinel arrives
+def _cache_writer():
+    for path, html in iter(_WRITE_Q.get, None):
+        try:
+            path.parent.mkdir(exist_ok=True)
+            # Write to a temporary file, then swap it into place, so a run killed mid-write
+            # never leaves a truncated cache file behind
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(gzip.compress(html.encode("utf-8")))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Could not write {path}: {e}")
+
+_WRITER = threading.Thread(target=_cache_writer, name="cache-writer", daemon=True)
+_WRITER.start()
+
+# At exit, let the writer finish everything still queued before the interpreter stops
+@atexit.register
+def _flush_cache_writes():
+    _WRITE_Q.put(None)
+    _WRITER.join()
+
+# Location of today's cached HTML for a ticker, e.g. .cache/BFZ_20250731.html.gz
+def cache_path(ticker: str) -> Path:
+    return CACHE_DIR / f"{ticker}_{date.today():%Y%m%d}.html.gz"
+
 # Scrape data for a single ticker
-def scrape_one(ticker: str) -> Dict[str, str]:
+async def scrape_one(ticker: str, force_rescrape: bool = False) -> Dict[str, str]:
+    cached = cache_path(ticker)
+    if not force_rescrape and cached.exists():
+        # Already fetched today: parse the cached HTML and skip the network entirely
+        try:
+            html = gzip.decompress(cached.read_bytes()).decode("utf-8")
+        except (OSError, EOFError, UnicodeDecodeError):
+            html = None  # Damaged cache file (e.g. truncated by a killed run): fetch the page again
+        if html is not None:
+            data = await run_blocking(parse_html, html)
+            data["Ticker"] = ticker
+            return data
+
     url = f"{BASE}/funds/{ticker.lower()}/"  # Construct URL for the specific ticker
-    html = render_with_playwright(url)  # Use Playwright to render the page and get the HTML
-    if DEBUG_SAVE_HTML:
-        # Save the raw HTML for debugging purposes
-        with open(f"debug_{ticker}.html", "w", encoding="utf-8") as f:
-            f.write(html)
-    data = parse_html(html)  # Parse the HTML and extract relevant data
+    # Fast path: many pages carry the data in the server-rendered HTML, so try a plain GET first
+    await rate_limit(url)
+    html = await run_blocking(fetch_static, url)
+    data = await run_blocking(parse_html, html)  # Parse on a worker thread so the other renders keep going
+    if len(set(data) & TARGET_LABELS) < MIN_STATIC_LABELS:
+        html = await render_with_playwright(url)  # Not enough data: render the page with Playwright
+        data = await run_blocking(parse_html, html)
+    # Keep the HTML the data came from, both for same-day reruns and for debugging the parser
+    # (a page that yielded nothing is not cached, so the next run tries it again)
+    if data:
+        _WRITE_Q.put((cached, html))  # Written in the background
     data["Ticker"] = ticker  # Add ticker to the data
     return data
 
-# Main function to scrape all tickers and save data to an Excel file
-def main():
-    rows = []
-    for t in TICKERS:
+# Scrape one ticker, turning any error into an error row
+async def scrape_row(ticker: str) -> Dict[str, str]:
+    try:
+        row = await scrape_one(ticker, force_rescrape=FORCE_RESCRAPE)  # Scrape data for the ticker
+    except Exception as e:
+        row = {"Ticker": ticker, "error": str(e)}  # Handle any errors during scraping
+    print(row)
+    return row
+
+# Columns of the output: Ticker, every target label, then the error of a ticker that failed; all strings
+SCHEMA = pa.schema([(name, pa.string()) for name in ["Ticker", *sorted(TARGET_LABELS), "error"]])
+
+# Main function to scrape all tickers, appending each row to the Parquet file as soon as it is ready
+async def main():
+    with pq.ParquetWriter(OUT_PARQUET, SCHEMA, compression="zstd") as writer:
         try:
-            row = scrape_one(t)  # Scrape data for each ticker
-        except Exception as e:
-            row = {"Ticker": t, "error": str(e)}  # Handle any errors during scraping
-        print(row)
-        rows.append(row)
-
-    # Create a DataFrame and ensure columns are in the right order
-    df = pd.DataFrame(rows)
-    for col in ["Ticker", *sorted(TARGET_LABELS)]:
-        if col not in df.columns:
-            df[col] = None
-    df = df[["Ticker", *sorted(TARGET_LABELS)] + [c for c in df.columns if c not in TARGET_LABELS and c != "Ticker"]]
-    df.to_excel(OUT_XLSX, index=False)  # Save the DataFrame to an Excel file
+            for next_row in asyncio.as_completed([scrape_row(t) for t in TICKERS]):
+                row = await next_row
+                writer.write_table(pa.Table.from_pylist([row], schema=SCHEMA))  # Missing labels become nulls
+        finally:
+            await _shutdown()  # Only has work to do if some ticker needed the browser
+            EXECUTOR.shutdown()
+    print(f"Saved -> {OUT_PARQUET}")
+
+    if EXPORT_EXCEL:
+        write_excel()
+
+# Copy OUT_PARQUET to OUT_XLSX, streaming the rows into a write-only workbook in TICKERS order
+def write_excel():
+    order = {t: i for i, t in enumerate(TICKERS)}
+    rows = sorted(pq.read_table(OUT_PARQUET).to_pylist(), key=lambda r: order.get(r["Ticker"], len(order)))
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(SCHEMA.names)
+    for row in rows:
+        ws.append([row[c] for c in SCHEMA.names])  # Missing values become empty cells
+    wb.save(OUT_XLSX)
     print(f"Saved -> {OUT_XLSX}")
 
 # Execute the main function if the script is run directly
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+# Shared parsing code and request headers for the cefdata.com scripts
+# (the synchronous requests session that fetches pages with them lives in cef_session.py)
+import re  # Used for regular expression operations to search for specific patterns (like dates)
+import threading  # Used to guard the parse cache's shared state
+import hashlib  # Used to key the parse cache by a hash of the page body
+from collections import OrderedDict  # Used to keep the parse cache in least-recently-used order
+from lxml import etree  # Used to precompile the XPath query
+from html_doc import parse_document  # Used for parsing the HTML content, tolerating empty or odd pages
+
+# Request headers shared by every call. Accept-Encoding is left to the HTTP libraries: requests/urllib3
+# and aiohttp already ask for gzip/deflate, and add br only when it can be decoded (pip install brotli)
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/91.0.4472.124 Safari/537.36"
+    ),
+}
+
+# ------------------- PARSING -------------------
+
+# Fields stored as-is when their label appears in a <td>
+TARGET_KEYS = frozenset({
+    "Current Distribution", "Earn Coverage", "Duration", "Maturity",
+    "Rel Lev Cost", "Outstanding Shares", "Estimated Total Assets",
+    "Total Leverage", "Average Discount (3 Yr)", "Market Yield",
+    "Div Growth (3yr)", "Credit Rating (rbo)", "AMT", "Expense Ratio"
+})
+
+# Regular expression to search for date in (mm/dd/yy) format, compiled once
+_DATE_RE = re.compile(r'\((\d{1,2}/\d{1,2}/\d{2})\)')
+_EPOCH = (1900, 1, 1)  # 'Very old' date used for undated entries
+
+# Function to turn the date in a given key text into a comparable key
+def date_key(key_text):
+    """
+    Returns the (mm/dd/yy) date in the key text as a (year, month, day) tuple of ints,
+    which compares like the date itself without building a datetime.
+    If no date is found, return a 'very old' date so that if there's another
+    dated entry, that will supersede this one.
+    """
+    match = _DATE_RE.search(key_text)
+    if not match:
+        return _EPOCH
+    month, day, year = map(int, match.group(1).split('/'))
+    return (year + (2000 if year < 69 else 1900), month, day)  # Same century rule as strptime's %y
+
+# Compiled once: every <td> cell in the document, which is where the fund data lives
+TD_CELLS = etree.XPath('//td')
+
+# Function to extract the fund fields from a fetched page
+def parse_html(text):
+    """
+    Pure CPU work with no I/O, so it can run on a worker thread.
+    Returns a dict of extracted fields, or None if nothing was found.
+    """
+    doc = parse_document(text)  # Parse the HTML content of the page with lxml
+    if doc is None:
+        return None  # Empty or unparseable page
+
+    # Most recent (date_key, value) seen so far for the dated fields
+    best_earnings = None
+    best_unii = None
+
+    # Other direct fields for final data
+    final_data = {}
+
+    # Text of every <td> element in the HTML (table data), each cell stripped once
+    texts = [td.text_content().strip() for td in TD_CELLS(doc)]
+    for i in range(len(texts) - 1):
+        key = texts[i]  # Text of the current <td>
+        val = texts[i+1]  # Text of the next <td>
+
+        # Check for specific keys and extract data accordingly
+        # (on equal dates the later entry wins, as it did when these were stored in a dict)
+        if "UNII / Share" in key:
+            k = date_key(key)  # Get the date if found
+            if best_unii is None or k >= best_unii[0]:
+                best_unii = (k, val)  # Keep only the most recent UNII value
+        elif "Earnings / Share" in key:
+            k = date_key(key)
+            if best_earnings is None or k >= best_earnings[0]:
+                best_earnings = (k, val)  # Keep only the most recent earnings value
+        elif key in TARGET_KEYS:
+            final_data[key] = val  # Directly store relevant fields in final_data
+
+    # Store the most recent dated values
+    if best_earnings:
+        final_data["Earnings / Share"] = best_earnings[1]
+    if best_unii:
+        final_data["UNII / Share"] = best_unii[1]
+
+    # Return the final data if available
+    return final_data if final_data else None
+
+# Parsed fields of recently seen pages, keyed by an 8-byte blake2b digest of the page body,
+# so a retried or duplicate page (e.g. tickers redirecting to the same overview) is parsed once
+PARSE_CACHE_SIZE = 256
+_parse_cache = OrderedDict()
+_parse_cache_lock = threading.Lock()  # parse_html_memo may be called from several worker threads
+
+# Same as parse_html, but skips the parse when an identical page body was parsed recently
+def parse_html_memo(text):
+    h = hashlib.blake2b(text.encode("utf-8", "ignore"), digest_size=8).digest()
+    with _parse_cache_lock:
+        if h in _parse_cache:
+            _parse_cache.move_to_end(h)  # Mark as most recently used
+            data = _parse_cache[h]
+            return dict(data) if data else None  # Callers add keys to the dict, so hand out a copy
+    data = parse_html(text)
+    with _parse_cache_lock:
+        _parse_cache[h] = data
+        if len(_parse_cache) > PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)  # Drop the least recently used page
+    return dict(data) if data else None
@@ -0,0 +1,56 @@
+# Synchronous fetching of cefdata.com pages over one shared requests session; kept apart from cef_fetch
+# so the async script can use the parser and headers without importing requests or cachecontrol
+import requests  # Used for making HTTP requests to get the webpage content
+import urllib3  # Used to check which retry options the installed urllib3 supports
+from urllib3.util.retry import Retry  # Used for setting retry behavior for HTTP requests
+from cachecontrol import CacheControlAdapter  # Used to cache pages and revalidate them with ETag / Last-Modified
+from cachecontrol.caches.file_cache import FileCache  # Used to keep the HTTP cache on disk between runs
+from cef_fetch import HEADERS, parse_html_memo  # Shared request headers and memoized page parser
+from rate_limiter import RateLimiter  # Shared with the EDGAR script
+
+# Random jitter on each backoff wait so retries don't line up; Retry only accepts it from urllib3 2.0 on,
+# so on urllib3 1.26 the plain exponential backoff is used
+RETRY_JITTER = {"backoff_jitter": 0.5} if int(urllib3.__version__.split(".")[0]) >= 2 else {}
+
+# Shared session so every ticker reuses the same keep-alive connection to cefdata.com
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+# Unchanged pages come back as a 304 and are served from the on-disk cache
+SESSION.mount("https://", CacheControlAdapter(
+    cache=FileCache(".web_cache"),
+    pool_connections=1,  # Only one host (cefdata.com) is ever contacted
+    pool_maxsize=4,  # Keep up to 4 connections alive in the pool
+    max_retries=Retry(
+        total=6,  # Maximum number of retries (connection errors and bad statuses alike)
+        backoff_factor=1.0,  # Exponential backoff between attempts: 1s, 2s, 4s, ...
+        status_forcelist=[429, 500, 502, 503, 504],  # Retry for these status codes
+        respect_retry_after_header=True,  # Wait as long as a 429/503 Retry-After header asks
+        raise_on_status=False,  # Hand back the final error response instead of raising
+        **RETRY_JITTER  # Up to 0.5s of random jitter per wait, where supported
+    )
+))
+
+LIMITER = RateLimiter(rate=4, per=1.0)  # At most 4 requests per second to cefdata.com
+
+# Function to fetch and parse one page over the shared session
+def fetch(url):
+    """
+    Returns: (fund_data, permanent_failure)
+      - fund_data is either a dict of extracted fields or None
+      - permanent_failure is True if a 404 error was encountered (no point retrying)
+    """
+    try:
+        with LIMITER:  # Wait for the rate limiter before every request
+            response = SESSION.get(url, timeout=10)
+        if response.status_code == 200:
+            return parse_html_memo(response.text), False
+        elif response.status_code == 404:
+            print(f"404 error for {url}. Permanent failure.")
+            return None, True  # Return True for permanent failure in case of 404 error
+        else:
+            print(f"Failed to fetch data from {url}. Status code: {response.status_code}")
+            return None, False  # Retryable failure for other status codes
+
+    except Exception as e:
+        print(f"Exception while fetching {url}: {e}")
+        return None, False  # Retryable failure for any other exception
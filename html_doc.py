@@ -0,0 +1,22 @@
+# Shared, tolerant HTML parsing for the cefdata.com scripts
+import re  # Used to find a leading XML declaration
+import lxml.html  # Used for parsing HTML content
+from lxml import etree  # Used for lxml's parser error type
+
+# Leading <?xml ... ?> declaration, which lxml will not accept together with an already-decoded str
+_XML_DECL_RE = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+# Parse a page's text with lxml.html; returns the document root, or None if there is no document to parse
+def parse_document(text):
+    if not text or not text.strip():
+        return None  # lxml refuses empty documents
+    try:
+        return lxml.html.fromstring(text)
+    except ValueError:
+        # The text is already decoded, so drop the encoding declaration lxml refuses and try again
+        try:
+            return lxml.html.fromstring(_XML_DECL_RE.sub("", text, count=1))
+        except (etree.ParserError, ValueError):
+            return None
+    except etree.ParserError:
+        return None  # e.g. a comment-only page
@@ -0,0 +1,23 @@
+# Shared rate limiter for the scripts that call cefdata.com and SEC from several threads
+import time  # Used to wait between requests on the monotonic clock
+import threading  # Used to guard the limiter's shared state across worker threads
+
+# Rate limiter on the monotonic clock: spaces requests at least `per / rate` seconds apart
+class RateLimiter:
+    def __init__(self, rate=4, per=1.0):
+        self.interval = per / rate  # Seconds between two requests
+        self.next_allowed_time = time.monotonic()  # Earliest time the next request may go out
+        self.lock = threading.Lock()  # Guards next_allowed_time across worker threads
+
+    # Block until the next request is allowed, then reserve the following slot
+    def __enter__(self):
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_allowed_time - now
+            self.next_allowed_time = max(now, self.next_allowed_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, *exc):
+        return False